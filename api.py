@@ -4,52 +4,190 @@ Book Translation Manager API
 Run: .venv/bin/uvicorn api:app --host 0.0.0.0 --port 8000 --reload
 """
 
+import asyncio
 import json
 import os
 import shutil
 import subprocess
 import tempfile
+import threading
 import time
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import quote
 
+import orjson
 from fastapi import FastAPI, HTTPException, UploadFile, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from starlette.background import BackgroundTask
 
-app = FastAPI(title="Book Translator API")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
-
 PROJECT = Path(__file__).parent
 BOOKS_DIR = PROJECT / "books"
 REGISTRY = PROJECT / "registry.json"
 VENV_PY = PROJECT / ".venv" / "bin" / "python"
+PROGRESS_POLL_SEC = 2.0
+EXPORT_TIMEOUT_SEC = 300
+STOP_TIMEOUT_SEC = 15.0
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    poller = asyncio.create_task(_progress_poller())
+    yield
+    poller.cancel()
+    if _daemon and _daemon.poll() is None:
+        _daemon.stdin.close()  # daemon stops the current job after its chunk and exits
+
+
+app = FastAPI(title="Book Translator API", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 
 # ── Registry helpers ──────────────────────────────────────────────────────────
+# registry.json кешується в пам'яті й перечитується лише коли змінився mtime
+# (наприклад, файл відредагували вручну). Запис — атомарний, через .tmp + os.replace.
+
+_reg_cache: dict | None = None
+_reg_mtime: float = 0.0
+_reg_lock = asyncio.Lock()
+
+
+def _reg_file_mtime() -> float:
+    try:
+        return REGISTRY.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
 
-def load_reg() -> dict:
-    if REGISTRY.exists():
-        return json.loads(REGISTRY.read_text(encoding="utf-8"))
-    return {}
+def _read_reg_file() -> dict:
+    try:
+        return orjson.loads(REGISTRY.read_bytes())
+    except FileNotFoundError:
+        return {}
+
+
+def _write_reg_file(payload: bytes) -> float:
+    tmp = REGISTRY.with_name(REGISTRY.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, REGISTRY)
+    return _reg_file_mtime()
 
 
-def save_reg(data: dict) -> None:
-    REGISTRY.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+async def load_reg() -> dict:
+    global _reg_cache, _reg_mtime
+    async with _reg_lock:
+        mtime = await asyncio.to_thread(_reg_file_mtime)
+        if _reg_cache is None or mtime != _reg_mtime:
+            _reg_cache = await asyncio.to_thread(_read_reg_file)
+            _reg_mtime = mtime
+        return _reg_cache
+
+
+async def save_reg(data: dict) -> None:
+    global _reg_cache, _reg_mtime
+    async with _reg_lock:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        _reg_mtime = await asyncio.to_thread(_write_reg_file, payload)
+        _reg_cache = data
 
 
 def read_progress(output_dir: Path) -> dict:
     p = output_dir / "progress.json"
     if p.exists():
         try:
-            return json.loads(p.read_text())
+            return orjson.loads(p.read_bytes())
         except Exception:
             pass
     return {"done": 0, "total": 0}
 
 
+# ── Progress cache ────────────────────────────────────────────────────────────
+# Один фоновий таск раз на PROGRESS_POLL_SEC перевіряє mtime усіх progress.json
+# і перечитує лише змінені. list_books бере дані з пам'яті.
+
+_progress_cache: dict[str, tuple[float, dict]] = {}  # book_id → (mtime, progress)
+
+
+def _scan_progress(dirs: dict[str, str], previous: dict[str, tuple[float, dict]]) -> dict:
+    fresh: dict[str, tuple[float, dict]] = {}
+    for book_id, output_dir in dirs.items():
+        out = PROJECT / output_dir
+        try:
+            mtime = (out / "progress.json").stat().st_mtime
+        except OSError:
+            mtime = 0.0
+        cached = previous.get(book_id)
+        if cached and cached[0] == mtime:
+            fresh[book_id] = cached
+        else:
+            fresh[book_id] = (mtime, read_progress(out))
+    return fresh
+
+
+async def _progress_poller() -> None:
+    global _progress_cache
+    while True:
+        try:
+            reg = await load_reg()
+            dirs = {book_id: book["output_dir"] for book_id, book in reg.items()}
+            _progress_cache = await asyncio.to_thread(_scan_progress, dirs, _progress_cache)
+        except Exception:
+            pass
+        await asyncio.sleep(PROGRESS_POLL_SEC)
+
+
+async def get_progress(book_id: str, output_dir: str) -> dict:
+    cached = _progress_cache.get(book_id)
+    if cached:
+        return cached[1]
+    # Book not seen by the poller yet — one-shot read
+    return await asyncio.to_thread(read_progress, PROJECT / output_dir)
+
+
+def _save_upload(src, dst: Path) -> None:
+    """Stream the uploaded file to disk in 1 MB pieces (no full copy in RAM)."""
+    with open(dst, "wb") as f:
+        shutil.copyfileobj(src, f, 1 << 20)
+
+
+def _reset_output(out_dir: Path) -> None:
+    """Init empty output files (nginx can serve them right away)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "book_ua.md").write_text("", encoding="utf-8")
+    (out_dir / "progress.json").write_text('{"done":0,"total":0}', encoding="utf-8")
+    (out_dir / ".checkpoint.json").write_text("", encoding="utf-8")
+    images_dir = out_dir / "images"
+    if images_dir.exists():
+        shutil.rmtree(images_dir)
+    images_dir.mkdir(exist_ok=True)
+
+
+def _remove_book_files(out_dir_rel: Path) -> None:
+    # New books live in books/{id}/, legacy books in output/ etc.
+    if str(out_dir_rel).startswith("books/"):
+        shutil.rmtree(PROJECT / out_dir_rel.parent, ignore_errors=True)
+    else:
+        shutil.rmtree(PROJECT / out_dir_rel, ignore_errors=True)
+
+
+LOG_TAIL_CHARS = 4000
+_LOG_TAIL_BYTES = 8192  # UTF-8 Ukrainian text is ~2 bytes/char, so 8 KB covers 4000 chars
+
+
+def _read_log(log: Path) -> str:
+    """Read only the tail of the log — constant cost however large the file grows."""
+    try:
+        with open(log, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            data = os.pread(f.fileno(), _LOG_TAIL_BYTES, max(0, size - _LOG_TAIL_BYTES))
+    except FileNotFoundError:
+        return ""
+    return data.decode("utf-8", errors="replace")[-LOG_TAIL_CHARS:]
+
+
 def pid_alive(pid) -> bool:
     if not pid:
         return False
@@ -61,7 +199,8 @@ def pid_alive(pid) -> bool:
 
 
 def kill_process(pid) -> None:
-    """SIGTERM → wait 3s → SIGKILL якщо ще живий."""
+    """SIGTERM → wait 3s → SIGKILL якщо ще живий.
+    Лише для легасі pid з registry — це не наші діти, тож waitpid недоступний."""
     if not pid_alive(pid):
         return
     try:
@@ -76,11 +215,66 @@ def kill_process(pid) -> None:
         pass
 
 
-def _launch_translation(pdf_path: Path, out_dir: Path, title: str, from_page: int) -> subprocess.Popen:
-    log = open(out_dir / "translation.log", "w")
-    return subprocess.Popen(
-        [
-            str(VENV_PY), "main.py", "translate",
+# ── Translation daemon ────────────────────────────────────────────────────────
+# Один довгоживучий translator_daemon.py тримає модель у пам'яті й виконує книги
+# по черзі. Статуси задач приходять рядками JSON з його stdout.
+
+_daemon: subprocess.Popen | None = None
+_daemon_lock = threading.Lock()
+_jobs: dict[str, dict] = {}  # book_id → {"msg": run message, "status": ..., "daemon": pid}
+_ACTIVE = ("queued", "running")
+
+
+def _daemon_reader(proc: subprocess.Popen) -> None:
+    for line in proc.stdout:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        job = _jobs.get(event.get("job"))
+        if job and job["daemon"] == proc.pid:
+            job["status"] = event.get("status")
+    # Daemon exited — its running and queued jobs are gone with it.
+    # Snapshot: this thread races with the event loop adding jobs to _jobs
+    for job in list(_jobs.values()):
+        if job["daemon"] == proc.pid and job["status"] in _ACTIVE:
+            job["status"] = "failed"
+
+
+def _send(proc: subprocess.Popen, msg: dict) -> None:
+    proc.stdin.write(json.dumps(msg, ensure_ascii=False) + "\n")
+    proc.stdin.flush()
+
+
+def _ensure_daemon() -> subprocess.Popen:
+    global _daemon
+    with _daemon_lock:
+        if _daemon is None or _daemon.poll() is not None:
+            _daemon = subprocess.Popen(
+                [str(VENV_PY), "translator_daemon.py"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                cwd=str(PROJECT),
+            )
+            threading.Thread(target=_daemon_reader, args=(_daemon,), daemon=True).start()
+        return _daemon
+
+
+def job_active(book_id: str) -> bool:
+    job = _jobs.get(book_id)
+    return bool(job) and job["status"] in _ACTIVE
+
+
+def _launch_translation(
+    book_id: str, pdf_path: Path, out_dir: Path, title: str, from_page: int, no_cache: bool = False,
+) -> None:
+    msg = {
+        "op": "run",
+        "job": book_id,
+        "log": str(out_dir / "translation.log"),
+        "args": [
             "--input", str(pdf_path),
             "--output", str(out_dir / "book_ua.md"),
             "--from-page", str(from_page),
@@ -88,25 +282,101 @@ def _launch_translation(pdf_path: Path, out_dir: Path, title: str, from_page: in
             "--backend", "mlx",
             "--checkpoint", str(out_dir / ".checkpoint.json"),
             "--title", title,
+            *(["--no-cache"] if no_cache else []),
         ],
-        stdout=log,
-        stderr=subprocess.STDOUT,
-        cwd=str(PROJECT),
-    )
+    }
+    proc = _ensure_daemon()
+    _jobs[book_id] = {"msg": msg, "status": "queued", "daemon": proc.pid}
+    _send(proc, msg)
+
+
+async def terminate_child(proc: subprocess.Popen, timeout: float = 3.0) -> None:
+    """SIGTERM → Popen.wait (waitpid, без опитування) → SIGKILL якщо ще живий."""
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(proc.wait), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await asyncio.to_thread(proc.wait)
+
+
+async def stop_translation(book_id: str, pid=None) -> None:
+    """Stop the daemon job (after its current chunk), or kill the daemon if it takes too long.
+    `pid` — legacy books that were started as a separate main.py process."""
+    if pid:
+        await asyncio.to_thread(kill_process, pid)
+    if not job_active(book_id):
+        return
+    proc = _ensure_daemon()
+    _send(proc, {"op": "stop", "job": book_id})
+    deadline = time.monotonic() + STOP_TIMEOUT_SEC
+    while job_active(book_id) and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if job_active(book_id):
+        # Stuck job (e.g. still extracting the PDF): kill the shared daemon. The other books were
+        # only queued behind it — detach them first so the reader doesn't fail them, then re-send
+        # them to a fresh daemon
+        _jobs[book_id]["status"] = "stopped"
+        queued = [job for job in _jobs.values() if job["daemon"] == proc.pid and job["status"] == "queued"]
+        for job in queued:
+            job["daemon"] = None
+        await terminate_child(proc)
+        if queued:
+            new = _ensure_daemon()
+            for job in queued:
+                job["daemon"] = new.pid
+                _send(new, job["msg"])
+
+
+# ── Export helpers ────────────────────────────────────────────────────────────
+
+_EXPORT_CHUNK = 64 * 1024
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+async def _stream_pandoc(proc: asyncio.subprocess.Process, first: bytes, stderr: asyncio.Task):
+    """Yield pandoc stdout in 64 KB pieces; kill pandoc if the client goes away.
+    A failed conversion raises, so the response is aborted instead of ending as a truncated EPUB."""
+    try:
+        yield first
+        while chunk := await asyncio.wait_for(proc.stdout.read(_EXPORT_CHUNK), EXPORT_TIMEOUT_SEC):
+            yield chunk
+        await proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f"pandoc exited with {proc.returncode}: {(await stderr).decode(errors='replace')[:400]}"
+            )
+    finally:
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        await proc.wait()
+        stderr.cancel()
 
 
 # ── Routes ────────────────────────────────────────────────────────────────────
 
 @app.get("/api/books")
-def list_books():
-    reg = load_reg()
+async def list_books():
+    reg = await load_reg()
+    books = list(reg.items())
+    progress = await asyncio.gather(
+        *(get_progress(book_id, book["output_dir"]) for book_id, book in books)
+    )
     result = {}
-    for book_id, book in reg.items():
-        out = PROJECT / book["output_dir"]
-        prog = read_progress(out)
+    for (book_id, book), prog in zip(books, progress):
         done, total = prog.get("done", 0), prog.get("total", 0)
-        pid = book.get("pid")
-        if pid_alive(pid):
+        if job_active(book_id) or pid_alive(book.get("pid")):
             status = "running"
         elif total > 0 and done >= total:
             status = "done"
@@ -125,23 +395,16 @@ async def create_book(
     book_id = uuid.uuid4().hex[:10]
     book_dir = BOOKS_DIR / book_id
     out_dir = book_dir / "output"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    (out_dir / "images").mkdir(exist_ok=True)
+    await asyncio.to_thread(_reset_output, out_dir)
 
     # Save PDF
     pdf_path = book_dir / "book.pdf"
-    pdf_path.write_bytes(await file.read())
-
-    # Init empty output files (nginx can serve them right away)
-    (out_dir / "book_ua.md").write_text("", encoding="utf-8")
-    (out_dir / "progress.json").write_text('{"done":0,"total":0}', encoding="utf-8")
-    checkpoint = out_dir / ".checkpoint.json"
-    checkpoint.write_text('{"chunks":{},"last_chunk":-1}', encoding="utf-8")
+    await asyncio.to_thread(_save_upload, file.file, pdf_path)
 
     # Launch translation subprocess
-    proc = _launch_translation(pdf_path, out_dir, title, from_page)
+    _launch_translation(book_id, pdf_path, out_dir, title, from_page)
 
-    reg = load_reg()
+    reg = await load_reg()
     reg[book_id] = {
         "title": title,
         "from_page": from_page,
@@ -149,46 +412,45 @@ async def create_book(
         "url_prefix": f"/data/books/{book_id}/output",
         "pdf_path": str(pdf_path),
         "created_at": datetime.now().isoformat(),
-        "pid": proc.pid,
+        "pid": None,
     }
-    save_reg(reg)
+    await save_reg(reg)
     return {"id": book_id, "status": "started"}
 
 
 @app.delete("/api/books/{book_id}")
-def delete_book(book_id: str):
-    reg = load_reg()
+async def delete_book(book_id: str):
+    reg = await load_reg()
     if book_id not in reg:
         raise HTTPException(status_code=404, detail="Not found")
 
-    kill_process(reg[book_id].get("pid"))
-
-    # Remove files: new books live in books/{id}/, legacy books in output/ etc.
     out_dir_rel = Path(reg[book_id]["output_dir"])
-    if str(out_dir_rel).startswith("books/"):
-        shutil.rmtree(PROJECT / out_dir_rel.parent, ignore_errors=True)
-    else:
-        shutil.rmtree(PROJECT / out_dir_rel, ignore_errors=True)
+    await stop_translation(book_id, reg[book_id].get("pid"))
+
+    await asyncio.to_thread(_remove_book_files, out_dir_rel)
 
-    del reg[book_id]
-    save_reg(reg)
+    reg.pop(book_id, None)
+    _progress_cache.pop(book_id, None)
+    _jobs.pop(book_id, None)
+    await save_reg(reg)
     return {"status": "deleted"}
 
 
 @app.post("/api/books/{book_id}/stop")
-def stop_book(book_id: str):
-    reg = load_reg()
+async def stop_book(book_id: str):
+    reg = await load_reg()
     if book_id not in reg:
         raise HTTPException(status_code=404, detail="Not found")
-    kill_process(reg[book_id].get("pid"))
-    reg[book_id]["pid"] = None
-    save_reg(reg)
+    book = reg[book_id]
+    await stop_translation(book_id, book.get("pid"))
+    book["pid"] = None
+    await save_reg(reg)
     return {"status": "stopped"}
 
 
 @app.post("/api/books/{book_id}/restart")
-def restart_book(book_id: str):
-    reg = load_reg()
+async def restart_book(book_id: str):
+    reg = await load_reg()
     if book_id not in reg:
         raise HTTPException(status_code=404, detail="Not found")
 
@@ -197,42 +459,35 @@ def restart_book(book_id: str):
     if not pdf_path_str:
         raise HTTPException(status_code=400, detail="PDF не знайдено — ця книга не підтримує перезапуск")
     pdf_path = Path(pdf_path_str)
-    if not pdf_path.exists():
+    if not await asyncio.to_thread(pdf_path.exists):
         raise HTTPException(status_code=404, detail="PDF файл не знайдено на диску")
 
-    kill_process(book.get("pid"))
+    await stop_translation(book_id, book.get("pid"))
 
     out_dir = PROJECT / book["output_dir"]
-    out_dir.mkdir(parents=True, exist_ok=True)
-    (out_dir / "book_ua.md").write_text("", encoding="utf-8")
-    (out_dir / "progress.json").write_text('{"done":0,"total":0}', encoding="utf-8")
-    (out_dir / ".checkpoint.json").write_text('{"chunks":{},"last_chunk":-1}', encoding="utf-8")
-    images_dir = out_dir / "images"
-    if images_dir.exists():
-        shutil.rmtree(images_dir)
-    images_dir.mkdir(exist_ok=True)
+    await asyncio.to_thread(_reset_output, out_dir)
+    _progress_cache.pop(book_id, None)
 
-    proc = _launch_translation(pdf_path, out_dir, book["title"], book.get("from_page", 1))
-    reg[book_id]["pid"] = proc.pid
-    save_reg(reg)
-    return {"status": "restarted", "pid": proc.pid}
+    # A restart means "translate again" — don't replay chunks from the translation cache
+    _launch_translation(book_id, pdf_path, out_dir, book["title"], book.get("from_page", 1), no_cache=True)
+    book["pid"] = None
+    await save_reg(reg)
+    return {"status": "restarted"}
 
 
 @app.get("/api/books/{book_id}/log")
-def get_log(book_id: str):
-    reg = load_reg()
+async def get_log(book_id: str):
+    reg = await load_reg()
     if book_id not in reg:
         raise HTTPException(status_code=404, detail="Not found")
     log = PROJECT / reg[book_id]["output_dir"] / "translation.log"
-    if log.exists():
-        return {"log": log.read_text(encoding="utf-8", errors="replace")[-4000:]}
-    return {"log": ""}
+    return {"log": await asyncio.to_thread(_read_log, log)}
 
 
 @app.get("/api/books/{book_id}/export")
-def export_book(book_id: str, format: str = "epub"):
+async def export_book(book_id: str, format: str = "epub"):
     """Generate and stream EPUB or PDF via pandoc."""
-    reg = load_reg()
+    reg = await load_reg()
     if book_id not in reg:
         raise HTTPException(status_code=404, detail="Not found")
 
@@ -245,31 +500,60 @@ def export_book(book_id: str, format: str = "epub"):
 
     out_dir = PROJECT / reg[book_id]["output_dir"]
     md_path = out_dir / "book_ua.md"
-    if not md_path.exists() or md_path.stat().st_size == 0:
+    if await asyncio.to_thread(lambda: not md_path.exists() or md_path.stat().st_size == 0):
         raise HTTPException(status_code=404, detail="Переклад ще не готовий")
 
+    title_slug = reg[book_id]["title"][:40].replace(" ", "_")
+    filename = f"{title_slug}.{fmt}"
+    cmd = ["pandoc", str(md_path), "--resource-path", str(out_dir), "-V", "lang=uk"]
+
+    if fmt == "epub":
+        # EPUB goes straight from pandoc's stdout to the client — no temp file
+        cmd += ["-t", "epub", "--epub-chapter-level=1", "-o", "-"]
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        stderr = asyncio.create_task(proc.stderr.read())
+        try:
+            # pandoc writes nothing until the whole EPUB is built — this is where it can hang
+            first = await asyncio.wait_for(proc.stdout.read(_EXPORT_CHUNK), EXPORT_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            stderr.cancel()
+            raise HTTPException(status_code=504, detail="pandoc: timeout")
+        if not first:
+            await proc.wait()
+            raise HTTPException(status_code=500, detail=f"pandoc: {(await stderr).decode(errors='replace')[:400]}")
+        return StreamingResponse(
+            _stream_pandoc(proc, first, stderr),
+            media_type="application/epub+zip",
+            headers={"Content-Disposition": _content_disposition(filename)},
+        )
+
+    # PDF: pandoc only renders through the engine into a named .pdf file.
     # Temp file so concurrent requests don't collide
-    tmp = tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False)
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
     out_path = Path(tmp.name)
     tmp.close()
 
-    cmd = ["pandoc", str(md_path), "-o", str(out_path), "--resource-path", str(out_dir)]
-    if fmt == "epub":
-        cmd += ["--epub-chapter-level=1", "-V", "lang=uk"]
-    elif fmt == "pdf":
-        weasyprint = str(PROJECT / ".venv" / "bin" / "weasyprint")
-        cmd += [f"--pdf-engine={weasyprint}", "-V", "lang=uk"]
-
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-    if result.returncode != 0:
+    weasyprint = str(PROJECT / ".venv" / "bin" / "weasyprint")
+    cmd += [f"--pdf-engine={weasyprint}", "-o", str(out_path)]
+    proc = await asyncio.create_subprocess_exec(*cmd, stderr=asyncio.subprocess.PIPE)
+    try:
+        _, err = await asyncio.wait_for(proc.communicate(), EXPORT_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
         out_path.unlink(missing_ok=True)
-        raise HTTPException(status_code=500, detail=f"pandoc: {result.stderr[:400]}")
+        raise HTTPException(status_code=504, detail="pandoc: timeout")
+    if proc.returncode != 0:
+        out_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=500, detail=f"pandoc: {err.decode(errors='replace')[:400]}")
 
-    title_slug = reg[book_id]["title"][:40].replace(" ", "_")
-    media = "application/epub+zip" if fmt == "epub" else "application/pdf"
     return FileResponse(
         path=str(out_path),
-        media_type=media,
-        filename=f"{title_slug}.{fmt}",
+        media_type="application/pdf",
+        filename=filename,
         background=BackgroundTask(lambda p=out_path: p.unlink(missing_ok=True)),
     )
@@ -1,17 +1,23 @@
 """
 PDF text + image extractor using PyMuPDF.
 Extracts text blocks (headings, paragraphs, code) AND images.
-Images are rendered from the page region and saved to output/images/.
+Images are saved to output/images/: embedded PNG/JPEG bytes are written as-is
+when usable, otherwise the page region is rendered (JPEG for photos, PNG for line-art).
+Long page ranges are split across worker processes (one fitz.Document each).
 """
 
+import os
 import re
 import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from itertools import repeat
+from operator import itemgetter
 from pathlib import Path
 from typing import Iterator
 
 
-@dataclass
+@dataclass(slots=True)
 class Block:
     page_num: int
     kind: str   # "heading1", "heading2", "paragraph", "code", "caption", "image"
@@ -19,22 +25,32 @@ class Block:
     bbox: tuple = None  # (x0, y0, x1, y1) — position on page, used for ordering
 
 
+_NUM_SPACES = re.compile(r'[\d\s]{10,}')
+_PRICE_ISBN = re.compile(r'ISBN|US \$|CAN \$')
+_SOCIAL = re.compile(r'Twitter:|linkedin\.com|youtube\.com')
+_PAGE_HEADER = re.compile(r'\d+\s*\|\s*|.+\|\s*\d+$')   # "12 | Chapter" or "Chapter | 12"
+_PUNCT = re.compile(r'[.,:;]')
+_TITLE_CASE = re.compile(r'[A-Z][a-z ]+')
+
+
 def _is_noise(text: str, page_num: int) -> bool:
     t = text.strip()
-    if not t or len(t) < 3:
+    n = len(t)
+    # Cheapest checks first; regexes only when they can still match
+    if n < 3:
         return True
-    if re.fullmatch(r'\d+', t):
+    if t.isdecimal():
         return True
-    if re.fullmatch(r'[\d\s]{10,}', t):
+    if n >= 10 and _NUM_SPACES.fullmatch(t):
         return True
-    if re.search(r'ISBN|US \$|CAN \$', t) and len(t) < 80:
+    if n < 80 and _PRICE_ISBN.search(t):
         return True
-    if re.search(r'Twitter:|linkedin\.com|youtube\.com', t):
+    if _SOCIAL.search(t):
         return True
-    if re.match(r'^\d+\s*\|\s*', t) or re.match(r'.+\|\s*\d+$', t):
+    if '|' in t and _PAGE_HEADER.match(t):
         return True
-    if page_num > 5 and len(t) < 40 and not re.search(r'[.,:;]', t):
-        if t.isupper() or re.fullmatch(r'[A-Z][a-z ]+', t):
+    if page_num > 5 and n < 40 and not _PUNCT.search(t):
+        if t.isupper() or _TITLE_CASE.fullmatch(t):
             return True
     return False
 
@@ -63,8 +79,7 @@ def _classify_block(spans_info: list[dict]) -> tuple[str, str]:
         if any(m in font for m in ["mono", "courier", "consola", "inconsolata", "sourcecodepro", "code"]):
             has_mono = True
 
-    text = " ".join(all_text_parts).strip()
-    text = re.sub(r'\s+', ' ', text)
+    text = " ".join(" ".join(all_text_parts).split())  # collapse whitespace runs, strip ends
 
     if has_mono:
         kind = "code"
@@ -80,12 +95,135 @@ def _classify_block(spans_info: list[dict]) -> tuple[str, str]:
     return kind, text
 
 
+def _text_spans(block: dict) -> list[dict]:
+    """Non-empty spans of a text block, in line order."""
+    return [
+        span
+        for line in block.get("lines", [])
+        for span in line.get("spans", [])
+        if span["text"].strip()
+    ]
+
+
+MIN_EMBEDDED_DPI = 100
+_WEB_IMAGE_EXT = {"png": "png", "jpeg": "jpg", "jpg": "jpg"}
+
+
+def _embedded_image(block: dict) -> tuple[bytes, str] | None:
+    """
+    Original encoded bytes of an image block (+ file extension) if they can be used as-is:
+    PNG/JPEG, no soft mask, not CMYK, not rotated/flipped, and at least MIN_EMBEDDED_DPI
+    at the size it is drawn on the page. None → render the region instead.
+    """
+    data = block.get("image")
+    ext = _WEB_IMAGE_EXT.get(block.get("ext", ""))
+    if not data or not ext or block.get("mask") or block.get("colorspace") == 4:
+        return None
+    a, b, c, d = tuple(block.get("transform", (1, 0, 0, 1, 0, 0)))[:4]
+    if abs(b) > 1e-3 or abs(c) > 1e-3 or a <= 0 or d <= 0:
+        return None
+    x0, _, x1, _ = block["bbox"]
+    if block.get("width", 0) * 72 < MIN_EMBEDDED_DPI * (x1 - x0):
+        return None
+    return data, ext
+
+
+PHOTO_MIN_COLORS = 4096   # more distinct colours than this → photo → JPEG
+JPEG_QUALITY = 85
+
+
+def _save_pixmap(pix: "fitz.Pixmap", images_path: Path, stem: str) -> str:
+    """Save a rendered region: JPEG for photos (much smaller, faster to encode),
+    lossless PNG for line-art/diagrams. Returns the file name."""
+    if pix.color_count() > PHOTO_MIN_COLORS:
+        filename = f"{stem}.jpg"
+        pix.save(str(images_path / filename), jpg_quality=JPEG_QUALITY)
+    else:
+        filename = f"{stem}.png"
+        pix.save(str(images_path / filename))
+    return filename
+
+
 def _is_tiny(bbox: tuple) -> bool:
     """Skip images smaller than 60×40 px (icons, decorations, bullets)."""
     x0, y0, x1, y1 = bbox
     return (x1 - x0) < 60 or (y1 - y0) < 40
 
 
+PARALLEL_MIN_PAGES = 8   # fewer pages → extract serially, pool start-up isn't worth it
+_PAGES_PER_TASK = 16
+
+
+def _page_blocks(page: "fitz.Page", page_num: int, images_path: Path | None, dpi: int) -> list[Block]:
+    """Text + image blocks of one page, sorted in reading order."""
+    # Image blocks (with their encoded bytes) only when images are wanted. That spares the
+    # images_dir=None callers (`info`); translation saves images, so it still pays for them here
+    flags = fitz.TEXT_PRESERVE_WHITESPACE
+    if images_path:
+        flags |= fitz.TEXT_PRESERVE_IMAGES
+    raw = page.get_text("dict", flags=flags)
+    blocks = raw["blocks"]
+
+    # ── Text blocks: classify and filter the whole page in one pass ──
+    # (raw index, bbox, spans) — the index keeps PyMuPDF order for equal positions
+    # Each placed entry carries its sort key (y0, x0, raw index), built once.
+    pending = [
+        (i, block.get("bbox", (0, 0, 0, 0)), _text_spans(block))
+        for i, block in enumerate(blocks) if block.get("type") == 0
+    ]
+    classified = [(i, bbox, _classify_block(spans)) for i, bbox, spans in pending if spans]
+    placed: list[tuple[tuple, Block]] = [
+        ((bbox[1], bbox[0], i), Block(page_num=page_num, kind=kind, text=text, bbox=tuple(bbox)))
+        for i, bbox, (kind, text) in classified
+        if not _is_noise(text, page_num)
+    ]
+
+    # ── Image blocks ──
+    img_count = 0
+    for i, block in enumerate(blocks):
+        # Explicit guard — don't rely on MuPDF omitting image blocks without TEXT_PRESERVE_IMAGES
+        if block.get("type") != 1 or not images_path:
+            continue
+        bbox = tuple(block.get("bbox", (0, 0, 0, 0)))
+        if _is_tiny(bbox):
+            continue
+
+        img_count += 1
+        stem = f"p{page_num:04d}_img{img_count:02d}"
+        embedded = _embedded_image(block)
+        if embedded:
+            # Source raster is good enough — keep its original encoding, no re-render
+            data, ext = embedded
+            filename = f"{stem}.{ext}"
+            (images_path / filename).write_bytes(data)
+        else:
+            # Render the image region from the page at given DPI
+            zoom = dpi / 72.0
+            mat = fitz.Matrix(zoom, zoom)
+            clip = fitz.Rect(bbox)
+            pix = page.get_pixmap(matrix=mat, clip=clip, alpha=False)
+            filename = _save_pixmap(pix, images_path, stem)
+
+        md_tag = f"\n![Рисунок {page_num}-{img_count}](images/{filename})\n"
+        placed.append(((bbox[1], bbox[0], i), Block(page_num=page_num, kind="image", text=md_tag, bbox=bbox)))
+
+    # Sort all blocks by vertical position (top→bottom), then horizontal
+    placed.sort(key=itemgetter(0))
+    return [b for _, b in placed]
+
+
+def _extract_range(pdf_path: str, first: int, last: int, images_dir: str | None, dpi: int) -> list[Block]:
+    """Worker: blocks of pages [first, last) (0-based). Opens its own document —
+    PyMuPDF objects can't be shared between threads or processes."""
+    images_path = Path(images_dir) if images_dir else None
+    with fitz.open(pdf_path) as doc:
+        return [
+            block
+            for page_idx in range(first, last)
+            for block in _page_blocks(doc[page_idx], page_idx + 1, images_path, dpi)
+        ]
+
+
 def extract_blocks(
     pdf_path: str,
     start_page: int = 1,
@@ -95,6 +233,7 @@ def extract_blocks(
 ) -> Iterator[Block]:
     """
     Yield Block objects from the PDF (text + images) in reading order.
+    Pages are extracted in parallel worker processes for longer ranges.
 
     Args:
         pdf_path:   Path to the PDF file.
@@ -103,71 +242,28 @@ def extract_blocks(
         images_dir: Directory to save extracted images. None = skip images.
         dpi:        Resolution for rendering image regions (150 is good quality, small size).
     """
-    doc = fitz.open(pdf_path)
-    total = len(doc)
+    total = get_total_pages(pdf_path)
     end = min(end_page, total) if end_page else total
     start = max(1, start_page)
 
     images_path = Path(images_dir).resolve() if images_dir else None
     if images_path:
         images_path.mkdir(parents=True, exist_ok=True)
-
-    img_counter: dict[int, int] = {}  # page_num → image count on that page
-
-    for page_idx in range(start - 1, end):
-        page = doc[page_idx]
-        page_num = page_idx + 1
-        raw = page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_PRESERVE_IMAGES)
-
-        all_blocks: list[Block] = []
-
-        # ── Text blocks ──
-        for block in raw["blocks"]:
-            bbox = tuple(block.get("bbox", (0, 0, 0, 0)))
-
-            if block.get("type") == 0:  # text
-                spans_info = []
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        if span["text"].strip():
-                            spans_info.append(span)
-
-                if not spans_info:
-                    continue
-
-                kind, text = _classify_block(spans_info)
-                if _is_noise(text, page_num):
-                    continue
-
-                all_blocks.append(Block(page_num=page_num, kind=kind, text=text, bbox=bbox))
-
-            elif block.get("type") == 1 and images_path:  # image
-                if _is_tiny(bbox):
-                    continue
-
-                img_counter[page_num] = img_counter.get(page_num, 0) + 1
-                idx = img_counter[page_num]
-                filename = f"p{page_num:04d}_img{idx:02d}.png"
-                img_path = images_path / filename
-
-                # Render the image region from the page at given DPI
-                zoom = dpi / 72.0
-                mat = fitz.Matrix(zoom, zoom)
-                clip = fitz.Rect(bbox)
-                pix = page.get_pixmap(matrix=mat, clip=clip, alpha=False)
-                pix.save(str(img_path))
-
-                md_tag = f"\n![Рисунок {page_num}-{idx}](images/{filename})\n"
-                all_blocks.append(
-                    Block(page_num=page_num, kind="image", text=md_tag, bbox=bbox)
-                )
-
-        # Sort all blocks by vertical position (top→bottom), then horizontal
-        all_blocks.sort(key=lambda b: (b.bbox[1], b.bbox[0]) if b.bbox else (0, 0))
-
-        yield from all_blocks
-
-    doc.close()
+    images_dir = str(images_path) if images_path else None
+
+    if end - start + 1 < PARALLEL_MIN_PAGES:
+        yield from _extract_range(pdf_path, start - 1, end, images_dir, dpi)
+        return
+
+    firsts = list(range(start - 1, end, _PAGES_PER_TASK))
+    lasts = [min(f + _PAGES_PER_TASK, end) for f in firsts]
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields results in submission order → pages stay in order
+        for blocks in pool.map(
+            _extract_range, repeat(pdf_path), firsts, lasts, repeat(images_dir), repeat(dpi)
+        ):
+            yield from blocks
 
 
 def blocks_to_chunks(blocks: Iterator[Block], max_words: int = 600) -> Iterator[list[Block]]:
@@ -2,6 +2,8 @@
 # Terms in KEEP_AS_IS will be preserved in English
 # Terms in TRANSLATE will be replaced with Ukrainian equivalents
 
+import functools
+
 KEEP_AS_IS = {
     # Core role terms — keep in English per user preference
     "software architect", "software architecture", "software engineering",
@@ -118,11 +120,9 @@ TECH_GLOSSARY = {
 }
 
 
+@functools.cache
 def build_glossary_note() -> str:
-    """Returns a markdown glossary section for the output document."""
-    lines = ["## Глосарій технічних термінів\n"]
-    lines.append("| Англійський термін | Українське значення |")
-    lines.append("|---|---|")
-    for en, ua in sorted(TECH_GLOSSARY.items()):
-        lines.append(f"| {en} | {ua} |")
-    return "\n".join(lines)
+    """Returns a markdown glossary section for the output document (built once)."""
+    header = "## Глосарій технічних термінів\n\n| Англійський термін | Українське значення |\n|---|---|\n"
+    return header + "\n".join(f"| {en} | {ua} |" for en, ua in sorted(TECH_GLOSSARY.items()))
+
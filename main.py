@@ -12,19 +12,23 @@ Usage:
 """
 
 import argparse
+import shutil
+import subprocess
 import sys
 import os
 from pathlib import Path
+from typing import Callable
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from extractor import extract_blocks, blocks_to_chunks, chunk_to_text, chunk_image_positions, get_total_pages
+from glossary import build_glossary_note, TECH_GLOSSARY
+from postprocess import process as postprocess_text
+from translator import TRANSLATION_CACHE_DIR, Translator
 
-def cmd_translate(args: argparse.Namespace) -> None:
-    from extractor import extract_blocks, blocks_to_chunks, chunk_to_text, chunk_image_positions, get_total_pages
-    from translator import Translator
-    from glossary import build_glossary_note
 
+def cmd_translate(args: argparse.Namespace, should_stop: Callable[[], bool] | None = None) -> None:
     pdf_path = args.input
     if not Path(pdf_path).exists():
         print(f"[помилка] Файл не знайдено: {pdf_path}")
@@ -69,7 +73,10 @@ def cmd_translate(args: argparse.Namespace) -> None:
     # Step 3: Translate
     print("Крок 2/2 — Перекладаємо...")
     checkpoint_file = args.checkpoint or (output_path.parent / ".checkpoint.json")
-    translator = Translator(checkpoint_path=str(checkpoint_file), backend=args.backend)
+    translator = Translator(
+        checkpoint_path=str(checkpoint_file), backend=args.backend, model=args.model,
+        parallel=args.parallel, cache_dir=None if args.no_cache else TRANSLATION_CACHE_DIR,
+    )
 
     if not args.resume:
         translator.clear_checkpoint()
@@ -89,16 +96,14 @@ def cmd_translate(args: argparse.Namespace) -> None:
         output_path=str(output_path),
         resume=args.resume,
         neural_fix=args.neural_fix,
+        should_stop=should_stop,
     )
 
-    final = glossary_header + translated
-    output_path.write_text(final, encoding="utf-8")
-
-    # Post-process: add English originals to first occurrence of each term
+    # Post-process: add English originals to first occurrence of each term.
+    # Done in memory on the text we already hold — the file is written once, not written/read/rewritten
     print("Крок 3/3 — Post-processing термінів...")
-    from postprocess import process as postprocess_text
-    current = output_path.read_text(encoding="utf-8")
-    processed, changes = postprocess_text(current)
+    processed, changes = postprocess_text(glossary_header + translated)
+    del translated
     output_path.write_text(processed, encoding="utf-8")
     print(f"  Термінів оновлено: {len(changes)}")
     for c in changes:
@@ -106,7 +111,7 @@ def cmd_translate(args: argparse.Namespace) -> None:
 
     print()
     print(f"Готово! Файл збережено: {output_path}")
-    print(f"Зображень збережено:    {len(list(Path(images_dir).glob('*.png')))} шт.")
+    print(f"Зображень збережено:    {sum(1 for p in Path(images_dir).iterdir() if p.is_file())} шт.")
     print(f"Розмір файлу:           {output_path.stat().st_size / 1024:.1f} KB")
 
     if args.glossary:
@@ -116,8 +121,6 @@ def cmd_translate(args: argparse.Namespace) -> None:
 
 
 def cmd_info(args: argparse.Namespace) -> None:
-    from extractor import extract_blocks, get_total_pages
-
     pdf_path = args.input
     if not Path(pdf_path).exists():
         print(f"[помилка] Файл не знайдено: {pdf_path}")
@@ -157,9 +160,6 @@ def cmd_info(args: argparse.Namespace) -> None:
 
 
 def cmd_export(args: argparse.Namespace) -> None:
-    import shutil
-    import subprocess
-
     if not shutil.which("pandoc"):
         print("[помилка] pandoc не встановлено.")
         print("Встанови: brew install pandoc")
@@ -212,13 +212,12 @@ def cmd_export(args: argparse.Namespace) -> None:
 
 
 def cmd_glossary(_args: argparse.Namespace) -> None:
-    from glossary import build_glossary_note, TECH_GLOSSARY
     print(f"Глосарій: {len(TECH_GLOSSARY)} технічних термінів\n")
     for en, ua in sorted(TECH_GLOSSARY.items()):
         print(f"  {en:<45} → {ua}")
 
 
-def main() -> None:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Перекладач технічних PDF-книг EN → UA (Ollama / Claude API)",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -237,6 +236,9 @@ def main() -> None:
     p_tr.add_argument("--glossary", action="store_true", help="Зберегти окремий глосарій")
     p_tr.add_argument("--neural-fix", action="store_true", help="Нейронне виправлення термінів після перекладу (повільніше, але точніше)")
     p_tr.add_argument("--backend", default="mlx", choices=["mlx", "ollama"], help="Бекенд: mlx (швидше, Apple Silicon) або ollama (за замовч.: mlx)")
+    p_tr.add_argument("--model", default=None, help="Модель: MLX repo id (за замовч.: mlx-community/aya-expanse-8b-4bit) або тег Ollama (aya-expanse:8b); менша/сильніше квантована — швидше")
+    p_tr.add_argument("--parallel", type=int, default=1, help="Ollama: паралельних запитів (потрібно OLLAMA_NUM_PARALLEL ≥ N); mlx: чанків в одній батч-генерації (без квантування KV-кешу)")
+    p_tr.add_argument("--no-cache", action="store_true", help=f"Не використовувати кеш перекладених чанків ({TRANSLATION_CACHE_DIR}/)")
     p_tr.add_argument("--checkpoint", default=None, help="Шлях до файлу checkpoint (за замовч.: <output_dir>/.checkpoint.json)")
     p_tr.add_argument("--title", default=None, help="Назва книги для заголовку перекладу")
 
@@ -253,6 +255,11 @@ def main() -> None:
     p_exp.add_argument("--output", "-o", default=None, help="Вихідний файл (за замовч.: поряд з input)")
     p_exp.add_argument("--format", "-f", default="epub", choices=["epub", "pdf"], help="Формат: epub або pdf (за замовч.: epub)")
 
+    return parser
+
+
+def main() -> None:
+    parser = build_parser()
     args = parser.parse_args()
 
     if args.command == "translate":
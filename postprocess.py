@@ -80,73 +80,84 @@ TERMS: dict[str, str] = {
 _FLAGS = re.IGNORECASE
 
 
-def _make_pattern(term: str) -> re.Pattern:
-    """Build a word-boundary-aware pattern for a Ukrainian term."""
-    escaped = re.escape(term)
-    # Ukrainian word boundary: look for term NOT already followed by (...)
-    return re.compile(
-        r'(?<!\w)(' + escaped + r')(?!\w)(?!\s*\([^)]*\))',
-        _FLAGS
-    )
+def _trie_regex(terms) -> str:
+    """Alternation factored into a prefix trie: the engine picks the branch by the next
+    character instead of trying every term in turn. Greedy `?` keeps longest-match-first,
+    so "доцентрова зв'язаність" still wins over a shorter term."""
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for ch in term.lower():
+            node = node.setdefault(ch, {})
+        node[''] = {}  # end of a term
 
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
 
-def process(text: str, preview: bool = False) -> tuple[str, list[str]]:
-    """
-    Add English originals to first occurrence of each Ukrainian term.
+    return build(trie)
 
-    Returns:
-        (processed_text, list_of_changes)
-    """
-    changes: list[str] = []
-    seen: set[str] = set()
 
-    # Skip code blocks — don't modify content inside ``` ... ```
-    code_blocks: list[tuple[int, int]] = []
-    for m in re.finditer(r'```.*?```', text, re.DOTALL):
-        code_blocks.append((m.start(), m.end()))
+def _make_pattern(terms) -> re.Pattern:
+    """Build one word-boundary-aware pattern for all Ukrainian terms."""
+    # Ukrainian word boundary; "already followed by (...)" is checked per hit in _annotate
+    return re.compile(r'(?<!\w)(' + _trie_regex(terms) + r')(?!\w)', _FLAGS)
 
-    def in_code_block(pos: int) -> bool:
-        return any(s <= pos < e for s, e in code_blocks)
 
-    # Process each term
-    for ua_term, en_term in sorted(TERMS.items(), key=lambda x: -len(x[0])):
-        key = ua_term.lower()
-        if key in seen:
-            continue
+_TERMS_RE = _make_pattern(TERMS)
+_EN_BY_TERM: dict[str, str] = {ua.lower(): en for ua, en in TERMS.items()}
+_ANNOTATED_RE = re.compile(r'\s*\([^)]*\)')  # term already has "(English)" after it
 
-        pattern = _make_pattern(ua_term)
-        match = pattern.search(text)
 
-        if not match:
-            continue
+_CODE_SPLIT_RE = re.compile(r'(```.*?```)', re.DOTALL)
 
-        # Skip if inside a code block
-        if in_code_block(match.start()):
-            # Try to find the next occurrence outside code blocks
-            for m in pattern.finditer(text):
-                if not in_code_block(m.start()):
-                    match = m
-                    break
-            else:
-                continue
 
+def _annotate(segment: str, seen: set[str], changes: list[str]) -> str:
+    """Annotate first occurrences (not yet in `seen`) within one prose segment."""
+    parts: list[str] = []
+    pos = 0
+    for m in _TERMS_RE.finditer(segment):
+        if _ANNOTATED_RE.match(segment, m.end()):
+            continue
+        original = m.group(1)
+        key = original.lower()
+        if key in seen:
+            continue
         seen.add(key)
-        original = match.group(1)
-        replacement = f"{original} ({en_term})"
+        replacement = f"{original} ({_EN_BY_TERM[key]})"
         changes.append(f"  «{original}» → «{replacement}»")
+        start, end = m.span(1)
+        parts.append(segment[pos:start])
+        parts.append(replacement)
+        pos = end
+        if len(seen) == len(_EN_BY_TERM):
+            break
+    parts.append(segment[pos:])
+    return "".join(parts)
+
+
+def process(text: str, preview: bool = False) -> tuple[str, list[str]]:
+    """
+    Add English originals to first occurrence of each Ukrainian term.
 
-        # Replace only this specific occurrence
-        start, end = match.span(1)
-        text = text[:start] + replacement + text[end:]
+    Returns:
+        (processed_text, list_of_changes)
+    """
+    changes: list[str] = []
+    seen: set[str] = set()
 
-        # Rebuild code_blocks offsets after replacement (offset shift)
-        delta = len(replacement) - len(original)
-        code_blocks = [
-            (s + delta if s > start else s, e + delta if e > start else e)
-            for s, e in code_blocks
-        ]
+    # Skip code blocks — split once: even segments are prose, odd ones are ``` ... ```
+    segments = _CODE_SPLIT_RE.split(text)
+    for i in range(0, len(segments), 2):
+        if len(seen) == len(_EN_BY_TERM):
+            break
+        segments[i] = _annotate(segments[i], seen, changes)
 
-    return text, changes
+    return "".join(segments), changes
 
 
 def main() -> None:
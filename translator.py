@@ -4,12 +4,23 @@ Translation engine with two backends:
   - Ollama         : HTTP API fallback, model must be running locally
 """
 
+import copy
+import hashlib
+import http.client
+import inspect
 import json
+import re
+import threading
 import time
 import os
-import urllib.request
-import urllib.error
+from collections import deque
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable
+
+import orjson
+from tqdm import tqdm
 
 from glossary import TECH_GLOSSARY
 
@@ -18,6 +29,16 @@ from glossary import TECH_GLOSSARY
 OLLAMA_URL   = "http://localhost:11434/api/generate"
 OLLAMA_MODEL = "aya-expanse:8b"
 MLX_MODEL    = "mlx-community/aya-expanse-8b-4bit"
+# MLX KV-cache quantization (decode is memory-bandwidth bound); KV_BITS=8 or 0 (off) in .env to revert
+MLX_KV_BITS = int(os.environ.get("KV_BITS", "4"))
+MLX_KV_GROUP_SIZE = 64
+# mlx_lm converts the *whole* KV cache (prefix included) once it holds this many tokens — not
+# "first N tokens stay fp16". The prefilled system prompt is longer, so quantization starts at step 1
+MLX_QUANTIZED_KV_START = 256
+MLX_SORT_WINDOW_BATCHES = 4  # chunks are length-sorted within this many consecutive batches
+OLLAMA_KEEP_ALIVE = "30m"  # keep the model loaded between chunks
+TRANSLATION_CACHE_DIR = ".translation_cache"  # chunk translations keyed by content hash
+OLLAMA_RETRY_BACKOFF_SEC = 1.5  # retry delays: 1.5 s, 3 s, 6 s, ...
 
 SYSTEM_PROMPT = """Ти — перекладач технічної книги. Перекладай текст з англійської на українську.
 
@@ -39,74 +60,87 @@ SYSTEM_PROMPT = """Ти — перекладач технічної книги.
 
 # ── Noise filter ─────────────────────────────────────────────────────────────
 
+_CJK_RUN = re.compile(r'[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ff]+[^\n]*')
+_CONTINUATION_PAREN = re.compile(r'\(Продовження тексту[^)]*\)[^\n]*')
+_CONTINUATION_BRACKET = re.compile(r'\[Продовження[^\]]*\][^\n]*')
+_TRAILING_FENCE = re.compile(r'([а-яіїєґА-ЯІЇЄҐA-Za-z0-9.,!?:;\)\"\'])\s*`{3}')
+_CODE_CHARS = re.compile(r'[{};=>\(\)]')
+_HASHTAG = re.compile(r'#\w+')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\Z')  # \Z: the last sentence ends at end of text
+# A line with no Ukrainian/English letter, digit, markdown char or whitespace at all
+# (by this point lines are only separated by \n)
+_FOREIGN_LINE = re.compile(r'^[^а-яіїєґА-ЯІЇЄҐA-Za-z0-9\s\-#*`_.,!?:()\[\]"]+$\n?', re.MULTILINE)
+
+
 def _strip_noise(text: str) -> str:
     """Remove CJK chars, hashtag spam, and repetition loops."""
-    import re
+    # Most responses are clean — each pass below is guarded by a cheap substring check
 
-    # Remove CJK character blocks
-    text = re.sub(r'[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ff]+[^\n]*', '', text)
+    # Remove CJK character blocks (a no-match sub is a single scan that returns text as-is)
+    text = _CJK_RUN.sub('', text)
 
     # Remove meta-annotations the model adds
-    text = re.sub(r'\(Продовження тексту[^)]*\)[^\n]*', '', text)
-    text = re.sub(r'\[Продовження[^\]]*\][^\n]*', '', text)
-
-    # Remove ``` that appears AFTER text on the same line — model artifact
-    # e.g. "...основної системи. ```" → "...основної системи."
-    # This prevents spurious code blocks that swallow subsequent image tags
-    text = re.sub(r'([а-яіїєґА-ЯІЇЄҐA-Za-z0-9.,!?:;\)\"\'])\s*`{3}', r'\1', text)
-
-    # Remove spurious standalone ``` not adjacent to actual code content
+    if 'Продовження' in text:
+        text = _CONTINUATION_PAREN.sub('', text)
+        text = _CONTINUATION_BRACKET.sub('', text)
+
+    has_fences = '```' in text
+    if has_fences:
+        # Remove ``` that appears AFTER text on the same line — model artifact
+        # e.g. "...основної системи. ```" → "...основної системи."
+        # This prevents spurious code blocks that swallow subsequent image tags
+        text = _TRAILING_FENCE.sub(r'\1', text)
+    check_hashtags = text.count('#') >= 3
+
+    # One pass over the lines: drop spurious ```, count fences, cut at hashtag spam
     lines = text.splitlines()
-    cleaned = []
-    for i, line in enumerate(lines):
-        if line.strip() == '```':
-            prev = lines[i-1].strip() if i > 0 else ''
-            nxt = lines[i+1].strip() if i < len(lines)-1 else ''
-            has_code_neighbor = (prev.startswith('    ') or nxt.startswith('    ') or
-                                  re.search(r'[{};=>\(\)]', prev + nxt))
-            if not has_code_neighbor:
-                continue  # skip spurious ```
-        cleaned.append(line)
-    lines = cleaned
-
-    # Fix unclosed code blocks: if odd number of ``` fences, close the last one
-    fence_count = sum(1 for l in lines if l.strip() == '```' or
-                      (l.strip().startswith('```') and len(l.strip()) <= 20))
-    if fence_count % 2 != 0:
-        lines.append('```')
-
-    # Cut off at hashtag spam (lines with 3+ hashtags = social media garbage)
-    clean = []
-    for line in lines:
-        hashtag_count = len(re.findall(r'#\w+', line))
-        if hashtag_count >= 3:
-            break  # stop here — everything after is hashtag spam
-        clean.append(line)
-    text = '\n'.join(clean)
-
-    # Detect repetition loop: if the same sentence repeats 3+ times — truncate
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    seen: dict[str, int] = {}
-    result_sentences = []
-    for s in sentences:
-        key = s.strip()[:60]  # first 60 chars as fingerprint
-        seen[key] = seen.get(key, 0) + 1
-        if seen[key] >= 3:
+    if has_fences or check_hashtags:
+        clean = []
+        fence_count = 0
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            if has_fences:
+                # Remove spurious standalone ``` not adjacent to actual code content
+                if stripped == '```':
+                    prev = lines[i-1].strip() if i > 0 else ''
+                    nxt = lines[i+1].strip() if i < len(lines)-1 else ''
+                    has_code_neighbor = (prev.startswith('    ') or nxt.startswith('    ') or
+                                          _CODE_CHARS.search(prev + nxt))
+                    if not has_code_neighbor:
+                        continue  # skip spurious ```
+                if stripped.startswith('```') and len(stripped) <= 20:
+                    fence_count += 1
+            # Cut off at hashtag spam (lines with 3+ hashtags = social media garbage)
+            if check_hashtags and len(_HASHTAG.findall(line)) >= 3:
+                break  # stop here — everything after is hashtag spam
+            clean.append(line)
+        else:
+            # Fix unclosed code blocks: if odd number of ``` fences, close the last one
+            if fence_count % 2 != 0:
+                clean.append('```')
+        lines = clean
+    text = '\n'.join(lines)
+
+    # Detect repetition loop: if the same sentence occurs 3 times within the last 16 — truncate
+    # right before it (slicing keeps the original line/paragraph breaks between sentences)
+    recent: deque[str] = deque(maxlen=16)
+    start = 0
+    for m in _SENTENCE_END.finditer(text):
+        # first 60 chars as fingerprint — sliced straight from the text, the sentence itself is never built
+        key = text[start:min(m.start(), start + 60)].strip()
+        if recent.count(key) >= 2:
+            text = text[:start]
             break
-        result_sentences.append(s)
-    text = ' '.join(result_sentences)
+        recent.append(key)
+        start = m.end()
 
     # Remove lines that are clearly not Ukrainian/English
-    lines = text.splitlines()
-    clean = [l for l in lines if l.strip() == '' or re.search(r'[а-яіїєґА-ЯІЇЄҐA-Za-z0-9\s\-#*`_.,!?:()\[\]"]', l)]
-    return '\n'.join(clean).strip()
+    return _FOREIGN_LINE.sub('', text).strip()
 
 
 # ── Code block placeholder helpers ────────────────────────────────────────────
 
-import re as _re
-
-_CODE_FENCE_RE = _re.compile(r'(```[\w]*\n[\s\S]*?```)', _re.MULTILINE)
+_CODE_FENCE_RE = re.compile(r'(```[\w]*\n[\s\S]*?```)', re.MULTILINE)
 
 
 def _extract_code_blocks(text: str) -> tuple[str, list[str]]:
@@ -115,21 +149,43 @@ def _extract_code_blocks(text: str) -> tuple[str, list[str]]:
     """
     blocks: list[str] = []
 
-    def replacer(m: _re.Match) -> str:
+    def replacer(m: re.Match) -> str:
         blocks.append(m.group(0))
         return f'«CODE_BLOCK_{len(blocks) - 1}»'
 
     return _CODE_FENCE_RE.sub(replacer, text), blocks
 
 
+_PLACEHOLDER_RE = re.compile(r'«CODE_BLOCK_\d+»')
+# Model may wrap the placeholder in backticks/quotes, or drop the guillemets altogether
+_PLACEHOLDER_WRAPPED_RE = re.compile(r'`*["\']?«CODE_BLOCK_(\d+)»["\']?`*')
+_PLACEHOLDER_BARE_RE = re.compile(r'`*CODE_BLOCK_(\d+)`*')
+
+# What is left outside code blocks may still be untranslatable: URLs, numbers, punctuation
+_URL_RE = re.compile(r'(?:https?://|www\.)\S+')
+_WORD_RE = re.compile(r'[^\W\d_]{2,}')
+
+
+def _has_prose(sanitized: str) -> bool:
+    """True if the text outside code placeholders has at least one word to translate."""
+    rest = _URL_RE.sub('', _PLACEHOLDER_RE.sub('', sanitized))
+    return _WORD_RE.search(rest) is not None
+
+
 def _restore_code_blocks(text: str, blocks: list[str]) -> str:
     """Restore code blocks; handle model wrapping placeholder in backticks/quotes."""
-    for idx, block in enumerate(blocks):
-        token = f'«CODE_BLOCK_{idx}»'
-        text = _re.sub(r'`*["\']?' + _re.escape(token) + r'["\']?`*', block, text)
-        # Fallback: token without guillemets (model dropped them)
-        if token not in text and f'CODE_BLOCK_{idx}' in text:
-            text = _re.sub(r'`*CODE_BLOCK_' + str(idx) + r'`*', block, text)
+    if not blocks:
+        return text
+
+    def restore(m: re.Match) -> str:
+        idx = int(m.group(1))
+        # a function (not a template string) so backslashes in code are inserted verbatim
+        return blocks[idx] if idx < len(blocks) else m.group(0)
+
+    text = _PLACEHOLDER_WRAPPED_RE.sub(restore, text)
+    # Fallback: token without guillemets (model dropped them)
+    if 'CODE_BLOCK_' in text:
+        text = _PLACEHOLDER_BARE_RE.sub(restore, text)
     return text
 
 
@@ -189,44 +245,93 @@ _FORCE_ENGLISH: list[tuple[str, str]] = [
 ]
 
 
+def _required_literal(pattern: str) -> str:
+    """Longest plain Cyrillic run every match must contain (lowercase), '' if none.
+    Optional parts — (?:...) / (?!...) groups, [...] classes, x? / x* — are blanked out first."""
+    plain = re.sub(r'\(\?[:!=][^)]*\)|\[[^\]]*\]|.[?*]', ' ', pattern)
+    return max(re.findall(r"[а-яіїєґ']+", plain), key=len, default='')
+
+
+# (literal, compiled, replacement) — a pattern only runs if its literal occurs in the text.
+# Patterns stay separate passes in list order: a fused alternation would pick the leftmost
+# match instead, e.g. "мікросервісів архітектури програмного забезпечення" would lose
+# "software architecture" to a partial "мікросервіс" hit.
+_FORCE_ENGLISH_RES: list[tuple[str, re.Pattern, str]] = [
+    (_required_literal(pattern), re.compile(pattern, re.IGNORECASE), replacement)
+    for pattern, replacement in _FORCE_ENGLISH
+]
+
+
 def _fix_english_terms(text: str) -> str:
-    import re
-    for pattern, replacement in _FORCE_ENGLISH:
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    # Replacements are Latin, so they never create or hide a Cyrillic literal checked later
+    lowered = text.lower()
+    for literal, pattern, replacement in _FORCE_ENGLISH_RES:
+        if literal in lowered:
+            text = pattern.sub(replacement, text)
     return text
 
 
 # ── Prompt builder ────────────────────────────────────────────────────────────
 
+# Substrings that mark a hallucinated result. Plain `in` checks: CPython's substring search
+# beats one regex alternation over these few literals
+# Bilingual markers — prompt scaffolding echoed back, never part of a real translation
+_BILINGUAL_MARKERS = (
+    '[Переклад українською]', '[Продовження тексту', '(Продовження тексту не надається',
+)
+_HALLUCINATION_MARKERS = _BILINGUAL_MARKERS + (
+    # Hallucinated section headers (may also be real headings — only grounds for a retry)
+    'Приклади використання', 'Висновки\n', 'Стратегії подолання',
+    'Класифікація ', 'Популярні архітектурні', 'Розробка та реалізація архітектури\n',
+    'Переваги та недоліки\n', 'Практичні поради\n',
+)
+
+
+def _is_too_long(source: str, result: str) -> bool:
+    # Output more than 2.5x longer than source → hallucination
+    src_words = len(source.split())
+    return src_words > 0 and len(result.split()) > src_words * 2.5
+
+
 def _is_hallucination(source: str, result: str) -> bool:
     """Detect if model hallucinated (added content, bilingual output, too long)."""
-    import re
-    # Bilingual markers
-    if '[Переклад українською]' in result or '[Продовження тексту' in result:
-        return True
-    if '(Продовження тексту не надається' in result:
+    if any(marker in result for marker in _HALLUCINATION_MARKERS):
         return True
-    # Hallucinated section headers
-    fake_sections = ['Приклади використання', 'Висновки\n', 'Стратегії подолання',
-                     'Класифікація ', 'Популярні архітектурні', 'Розробка та реалізація архітектури\n',
-                     'Переваги та недоліки\n', 'Практичні поради\n']
-    if any(s in result for s in fake_sections):
-        return True
-    # Output more than 2.5x longer than source → hallucination
-    src_words = len(source.split())
-    out_words = len(result.split())
-    if src_words > 0 and out_words > src_words * 2.5:
+    return _is_too_long(source, result)
+
+
+def _is_runaway(source: str, partial: str) -> bool:
+    """Stricter check for cutting a streamed generation short: only signs that cannot occur in
+    a correct translation (section-header markers can — a chunk may start with a real heading)."""
+    if any(marker in partial for marker in _BILINGUAL_MARKERS):
         return True
-    return False
+    return _is_too_long(source, partial)
+
+
+_CONTEXT_MAX_CHARS = 400
+_UNIT_BREAK = re.compile(r'[.!?]\s+|\n\s*')  # end of a sentence or line
+
+
+def _context_tail(prev_context: str, max_chars: int = _CONTEXT_MAX_CHARS) -> str:
+    """Last <= max_chars of the previous translation, starting at a sentence/line (else word)
+    boundary — a whole text unit instead of a mid-word cut."""
+    if len(prev_context) <= max_chars:
+        return prev_context
+    window = prev_context[-max_chars:]
+    m = _UNIT_BREAK.search(window)
+    if m and window[m.end():].strip():
+        return window[m.end():]
+    cut = window.find(' ')
+    return window[cut + 1:] if cut != -1 else window
 
 
 def _build_prompt(text: str, prev_context: str = "") -> str:
+    """Per-chunk part of the prompt; SYSTEM_PROMPT is added by the backend."""
     context_part = ""
     if prev_context.strip():
-        context_part = f"[Попередній контекст для узгодженості термінології]:\n{prev_context[-400:]}\n\n"
+        context_part = f"[Попередній контекст для узгодженості термінології]:\n{_context_tail(prev_context)}\n\n"
 
     return (
-        f"{SYSTEM_PROMPT}\n\n"
         f"{context_part}"
         f"[Текст для перекладу]:\n{text}\n\n"
         f"[Переклад українською]:"
@@ -235,84 +340,221 @@ def _build_prompt(text: str, prev_context: str = "") -> str:
 
 # ── MLX backend ───────────────────────────────────────────────────────────────
 
+# mlx-lm is imported lazily: it only exists on Apple Silicon, the Ollama backend must work without it
 _mlx_model = None
+_mlx_model_id: str | None = None
 _mlx_tokenizer = None
+_mlx_generate_fn = None
+_mlx_batch_fn = None  # mlx_lm.batch_generate, if this mlx-lm has it
+_mlx_batch_prefix = False  # batch_generate takes per-row prompt_caches (the prefilled system prompt)
+_mlx_sampler = None
+# system prompt → KV cache with "<system>\n\n" already prefilled; copied per request
+_mlx_prefix_caches: dict[str, list] = {}
 
 
 def _load_mlx_model(model_id: str) -> None:
-    global _mlx_model, _mlx_tokenizer
-    if _mlx_model is None:
+    global _mlx_model, _mlx_model_id, _mlx_tokenizer, _mlx_generate_fn, _mlx_batch_fn, _mlx_sampler
+    global _mlx_batch_prefix
+    if _mlx_model_id != model_id:  # the daemon keeps one model resident; reload only if another is asked for
         print(f"  Завантаження MLX моделі {model_id} ...")
-        from mlx_lm import load
+        from mlx_lm import generate, load
+        from mlx_lm.sample_utils import make_sampler
         _mlx_model, _mlx_tokenizer = load(model_id)
+        _mlx_model_id = model_id
+        _mlx_prefix_caches.clear()
+        _mlx_generate_fn = generate
+        try:
+            from mlx_lm import batch_generate
+        except ImportError:
+            batch_generate = None  # older mlx-lm: chunks are generated one at a time
+        _mlx_batch_fn = batch_generate
+        _mlx_batch_prefix = batch_generate is not None and (
+            "prompt_caches" in inspect.signature(batch_generate).parameters
+        )
+        _mlx_sampler = make_sampler(temp=0.2, top_p=0.9)
         print("  Модель завантажена в пам'ять (Neural Engine / GPU)")
 
 
-def _mlx_generate(prompt: str, model_id: str, max_tokens: int = 4096) -> str:
+def _mlx_prefix_cache(system: str) -> list:
+    """Fresh copy of the KV cache holding the prefilled system prompt (prefill runs once per prompt)."""
+    if system not in _mlx_prefix_caches:
+        import mlx.core as mx
+        from mlx_lm.models.cache import make_prompt_cache
+        cache = make_prompt_cache(_mlx_model)
+        _mlx_model(mx.array(_mlx_tokenizer.encode(f"{system}\n\n"))[None], cache=cache)
+        mx.eval([c.state for c in cache])
+        _mlx_prefix_caches[system] = cache
+    return copy.deepcopy(_mlx_prefix_caches[system])
+
+
+def _mlx_generate(prompt: str, model_id: str, max_tokens: int = 4096, system: str = "") -> str:
     _load_mlx_model(model_id)
-    from mlx_lm import generate
-    from mlx_lm.sample_utils import make_sampler
-    sampler = make_sampler(temp=0.2, top_p=0.9)
-    result = generate(
+    if system:
+        # Only the per-chunk part is tokenized and prefilled; the system prompt comes from the cache
+        prompt_tokens = _mlx_tokenizer.encode(prompt, add_special_tokens=False)
+        cache_kwargs = {"prompt_cache": _mlx_prefix_cache(system)}
+    else:
+        prompt_tokens = _mlx_tokenizer.encode(prompt)
+        cache_kwargs = {}
+    result = _mlx_generate_fn(
         _mlx_model,
         _mlx_tokenizer,
-        prompt=prompt,
+        prompt=prompt_tokens,
         max_tokens=max_tokens,
-        sampler=sampler,
-        kv_bits=8,          # quantize KV-cache → less memory bandwidth → faster
+        sampler=_mlx_sampler,
+        kv_bits=MLX_KV_BITS or None,    # quantize KV-cache → less memory bandwidth → faster
+        kv_group_size=MLX_KV_GROUP_SIZE,
+        quantized_kv_start=MLX_QUANTIZED_KV_START,
         verbose=False,
+        **cache_kwargs,
     )
     return _strip_noise(result)
 
 
+def _mlx_generate_batch(
+    prompts: list[str], model_id: str, max_tokens: int = 4096, system: str = "",
+) -> list[str]:
+    """Generate several prompts in one batched run — prefill and decode of all rows share the GPU.
+    Each row starts from its own copy of the prefilled system prompt (if this mlx-lm allows it).
+    The KV cache is NOT quantized here: mlx-lm's BatchGenerator has no kv_bits option."""
+    _load_mlx_model(model_id)
+    if len(prompts) == 1 or _mlx_batch_fn is None:
+        return [_mlx_generate(p, model_id, max_tokens, system=system) for p in prompts]
+    if system and _mlx_batch_prefix:
+        tokens = [_mlx_tokenizer.encode(p, add_special_tokens=False) for p in prompts]
+        cache_kwargs = {"prompt_caches": [_mlx_prefix_cache(system) for _ in prompts]}
+    else:
+        prefix = f"{system}\n\n" if system else ""
+        tokens = [_mlx_tokenizer.encode(prefix + p) for p in prompts]
+        cache_kwargs = {}
+    response = _mlx_batch_fn(
+        _mlx_model,
+        _mlx_tokenizer,
+        prompts=tokens,
+        max_tokens=max_tokens,
+        sampler=_mlx_sampler,
+        verbose=False,
+        **cache_kwargs,
+    )
+    return [_strip_noise(text) for text in response.texts]
+
+
 # ── Ollama backend ────────────────────────────────────────────────────────────
 
+# One keep-alive connection per thread (--parallel translates from a thread pool)
+_ollama_local = threading.local()
+_RECONNECT_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+def _ollama_conn(timeout: float) -> http.client.HTTPConnection:
+    conn = getattr(_ollama_local, "conn", None)
+    if conn is None:
+        url = urllib.parse.urlsplit(OLLAMA_URL)
+        conn = _ollama_local.conn = http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn
+
+
+def _ollama_request(method: str, path: str, body: bytes | None, timeout: float) -> http.client.HTTPResponse:
+    """Send one request over this thread's connection. The caller must read the response fully
+    (or close the connection) before the next request."""
+    conn = _ollama_conn(timeout)
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    reused = conn.sock is not None
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        return conn.getresponse()
+    except _RECONNECT_ERRORS:
+        conn.close()
+        if not reused:
+            raise
+        # Ollama dropped the idle keep-alive connection — reconnect once right away
+        conn.request(method, path, body=body, headers=headers)
+        return conn.getresponse()
+    except BaseException:
+        conn.close()
+        raise
+
+
 def _is_ollama_running() -> bool:
     try:
-        urllib.request.urlopen("http://localhost:11434", timeout=3)
+        _ollama_request("GET", "/", None, timeout=3).read()
         return True
     except Exception:
+        _ollama_local.conn = None
         return False
 
 
 def _is_model_available(model: str) -> bool:
     try:
-        req = urllib.request.Request("http://localhost:11434/api/tags")
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            data = json.loads(resp.read())
-            models = [m["name"] for m in data.get("models", [])]
-            return any(model in m for m in models)
+        resp = _ollama_request("GET", "/api/tags", None, timeout=5)
+        data = json.loads(resp.read())
+        models = [m["name"] for m in data.get("models", [])]
+        return any(model in m for m in models)
     except Exception:
+        _ollama_local.conn = None
         return False
 
 
-def _ollama_generate(prompt: str, model: str, retries: int = 3) -> str:
+STREAM_CHECK_EVERY = 32  # run abort_if every N streamed pieces (~tokens)
+
+
+def _ollama_stream(
+    payload: bytes, timeout: float, abort_if: Callable[[str], bool] | None = None,
+) -> str:
+    """POST a "stream": true request and join the NDJSON `response` pieces as they arrive.
+    abort_if(cleaned_partial) → True stops the generation early and returns the partial text."""
+    resp = _ollama_request("POST", urllib.parse.urlsplit(OLLAMA_URL).path, payload, timeout)
+    try:
+        if resp.status != 200:
+            raise RuntimeError(f"Ollama HTTP {resp.status}: {resp.read()[:200]!r}")
+        parts: list[str] = []
+        for line in resp:
+            if not line.strip():
+                continue
+            piece = json.loads(line)
+            parts.append(piece.get("response", ""))
+            if piece.get("done"):
+                break
+            if abort_if and len(parts) % STREAM_CHECK_EVERY == 0 and abort_if(_strip_noise("".join(parts))):
+                # Closing the connection makes Ollama cancel the rest of the generation
+                _ollama_local.conn.close()
+                return "".join(parts)
+        resp.read()  # drain the chunked trailer so the connection can be reused
+    except BaseException:
+        _ollama_local.conn.close()  # next request reconnects
+        raise
+    return "".join(parts)
+
+
+def _ollama_generate(
+    prompt: str, model: str, retries: int = 3, system: str = SYSTEM_PROMPT,
+    abort_if: Callable[[str], bool] | None = None,
+) -> str:
+    # System prompt goes in its own field: identical across chunks, so Ollama reuses its KV state
     payload = json.dumps({
         "model": model,
+        "system": system,
         "prompt": prompt,
-        "stream": False,
+        "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
         "options": {"temperature": 0.2, "num_predict": 4096, "top_p": 0.9},
     }).encode("utf-8")
 
     for attempt in range(retries):
         try:
-            req = urllib.request.Request(
-                OLLAMA_URL,
-                data=payload,
-                headers={"Content-Type": "application/json"},
-                method="POST",
-            )
-            with urllib.request.urlopen(req, timeout=300) as resp:
-                result = json.loads(resp.read())
-                return _strip_noise(result.get("response", ""))
-        except urllib.error.URLError as e:
+            # timeout applies per read, so a long generation is fine as long as tokens keep coming
+            return _strip_noise(_ollama_stream(payload, timeout=300, abort_if=abort_if))
+        except (OSError, http.client.HTTPException) as e:
             if attempt == retries - 1:
                 raise RuntimeError(f"Ollama недоступний: {e}")
-            time.sleep(3)
+            time.sleep(OLLAMA_RETRY_BACKOFF_SEC * 2 ** attempt)
         except Exception:
             if attempt == retries - 1:
                 raise
-            time.sleep(3)
+            time.sleep(OLLAMA_RETRY_BACKOFF_SEC * 2 ** attempt)
 
     return ""
 
@@ -327,33 +569,39 @@ _TERM_FIX_PROMPT = """Ти — редактор технічного перек
 Якщо виправлень немає — поверни текст без змін."""
 
 
+# Acronyms (API, APIs) and CamelCase / camelCase identifiers (JavaScript, gRPC) — the terms
+# the fix pass is for. A source without any is plain prose and skips the second generation
+_NEEDS_FIX_RE = re.compile(r'\b(?:[A-Z]{2,}s?|[A-Z]?[a-z]+[A-Z]\w*)\b')
+
+_FIX_SOURCE_MAX_CHARS = 1200
+
+
 def _neural_fix_terms(source: str, translated: str, backend: str, model: str) -> str:
     if not translated.strip() or not source.strip():
         return translated
+    source = source[:_FIX_SOURCE_MAX_CHARS]
+    if not _NEEDS_FIX_RE.search(source):
+        return translated
 
     prompt = (
-        f"{_TERM_FIX_PROMPT}\n\n"
-        f"[Оригінал (англійська)]:\n{source[:1200]}\n\n"
+        f"[Оригінал (англійська)]:\n{source}\n\n"
         f"[Переклад (до виправлення)]:\n{translated}\n\n"
         f"[Виправлений переклад]:"
     )
 
     try:
         if backend == "mlx":
-            fixed = _mlx_generate(prompt, model, max_tokens=2048)
+            fixed = _mlx_generate(prompt, model, max_tokens=2048, system=_TERM_FIX_PROMPT)
         else:
             payload = json.dumps({
                 "model": model,
+                "system": _TERM_FIX_PROMPT,
                 "prompt": prompt,
-                "stream": False,
+                "stream": True,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
                 "options": {"temperature": 0.1, "num_predict": 2048, "top_p": 0.9},
             }).encode("utf-8")
-            req = urllib.request.Request(
-                OLLAMA_URL, data=payload,
-                headers={"Content-Type": "application/json"}, method="POST",
-            )
-            with urllib.request.urlopen(req, timeout=120) as resp:
-                fixed = _strip_noise(json.loads(resp.read()).get("response", "")).strip()
+            fixed = _strip_noise(_ollama_stream(payload, timeout=120)).strip()
 
         if len(fixed) < len(translated) * 0.5:
             return translated
@@ -364,30 +612,107 @@ def _neural_fix_terms(source: str, translated: str, backend: str, model: str) ->
 
 # ── Checkpoint helpers ────────────────────────────────────────────────────────
 
+# Checkpoint is an append-only log: one {"i": N, "text": "..."} line per finished chunk.
+# last_chunk = end of the contiguous prefix of finished chunks.
+
+OUTPUT_SEPARATOR = "\n\n---\n\n"
+
+
 def _load_checkpoint(path: Path) -> dict:
+    chunks: dict[str, str] = {}
     if path.exists():
+        data = path.read_bytes()
         try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            pass
-    return {"chunks": {}, "last_chunk": -1}
+            legacy = orjson.loads(data)  # old format: one {"chunks": {...}, "last_chunk": N} object
+        except orjson.JSONDecodeError:
+            legacy = None
+        if isinstance(legacy, dict) and "chunks" in legacy:
+            chunks = dict(legacy["chunks"])
+            # Convert to JSONL now: appending lines onto the old object would leave a file
+            # that is neither JSON nor JSONL, and the next load would lose all progress
+            _rewrite_checkpoint(path, chunks)
+        else:
+            for line in data.splitlines():
+                try:
+                    entry = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue  # torn last line after a crash
+                chunks[str(entry["i"])] = entry["text"]
+            if data and not data.endswith(b"\n"):
+                # Torn tail: the next appended line would be glued onto it and lost too
+                _rewrite_checkpoint(path, chunks)
+    last = -1
+    while str(last + 1) in chunks:
+        last += 1
+    return {"chunks": chunks, "last_chunk": last}
+
+
+def _rewrite_checkpoint(path: Path, chunks: dict[str, str]) -> None:
+    """Write chunks as a fresh JSONL checkpoint (in place — the file may be a Docker mount)."""
+    with open(path, "wb") as f:
+        for idx, text in chunks.items():
+            f.write(orjson.dumps({"i": int(idx), "text": text}, option=orjson.OPT_APPEND_NEWLINE))
+        f.flush()
+        os.fsync(f.fileno())
 
 
-def _save_checkpoint(path: Path, state: dict, total: int = 0) -> None:
-    path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+def _append_checkpoint(path: Path, idx: int, text: str) -> None:
+    with open(path, "ab") as f:
+        f.write(orjson.dumps({"i": idx, "text": text}, option=orjson.OPT_APPEND_NEWLINE))
+
+
+def _save_progress(path: Path, done: int, total: int) -> None:
     progress_path = path.parent / "progress.json"
-    progress = {"done": state["last_chunk"] + 1, "total": total or state.get("total", 0)}
-    progress_path.write_text(json.dumps(progress), encoding="utf-8")
+    progress_path.write_bytes(orjson.dumps({"done": done, "total": total}))
 
 
 def _write_output(path: Path, results: list[str], up_to: int) -> None:
-    text = "\n\n---\n\n".join(r for r in results[:up_to + 1] if r)
+    text = OUTPUT_SEPARATOR.join(r for r in results[:up_to + 1] if r)
     with open(path, "w", encoding="utf-8") as f:
         f.write(text)
         f.flush()
         os.fsync(f.fileno())
 
 
+def _append_output(path: Path, texts: list[str], separate_first: bool) -> None:
+    """Append finished chunks to the output .md (the file already holds everything before them)."""
+    text = OUTPUT_SEPARATOR.join(texts)
+    if separate_first:
+        text = OUTPUT_SEPARATOR + text
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# ── Translation cache ─────────────────────────────────────────────────────────
+
+# Repeated chunks (boilerplate, captions, re-runs of the same book) are translated once:
+# <cache_dir>/<key[:2]>/<key>, key = blake2b(prompts, backend, model, neural_fix, chunk text).
+# Editing a prompt changes the key, so stale translations are never reused; chunks that differ
+# only in trailing whitespace share an entry (interior spaces are kept — code indentation matters)
+
+_CACHE_SALT = hashlib.blake2b(
+    f"{SYSTEM_PROMPT}\0{_TERM_FIX_PROMPT}".encode("utf-8"), digest_size=8,
+).hexdigest()
+_CACHE_TRAILING_WS_RE = re.compile(r'[ \t]+$', re.MULTILINE)
+
+
+def _cache_file(cache_dir: Path, backend: str, model: str, neural_fix: bool, text: str) -> Path:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{_CACHE_SALT}\0{backend}\0{model}\0{int(neural_fix)}\0".encode("utf-8"))
+    h.update(_CACHE_TRAILING_WS_RE.sub('', text).rstrip().encode("utf-8"))
+    key = h.hexdigest()
+    return cache_dir / key[:2] / key
+
+
+def _cache_store(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)  # atomic: parallel workers may store the same chunk
+
+
 # ── Image interleaving ────────────────────────────────────────────────────────
 
 def _interleave_images(translated: str, image_positions: list[tuple[float, str]]) -> str:
@@ -431,20 +756,32 @@ def _interleave_images(translated: str, image_positions: list[tuple[float, str]]
 
 # ── Main translator class ─────────────────────────────────────────────────────
 
+class TranslationStopped(Exception):
+    """Raised between chunks when the caller asked to stop (checkpoint is already saved)."""
+
+
 class Translator:
     def __init__(
         self,
         checkpoint_path: str = ".checkpoint.json",
         model: str | None = None,
         backend: str = "mlx",
+        parallel: int = 1,
+        cache_dir: str | None = TRANSLATION_CACHE_DIR,
     ):
         self.checkpoint_path = Path(checkpoint_path)
         self.backend = backend
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        # Ollama: concurrent requests; MLX: batch size of one batched generation
+        self.parallel = max(1, parallel)
+        self.verbatim_chunks = 0  # chunks returned as-is without a model call
 
         if backend == "mlx":
             self.model = model or MLX_MODEL
             # Trigger model load early so we fail fast if mlx-lm is missing
             _load_mlx_model(self.model)
+            if _mlx_batch_fn is None:
+                self.parallel = 1
         else:
             self.model = model or OLLAMA_MODEL
             if not _is_ollama_running():
@@ -459,39 +796,90 @@ class Translator:
         if self.checkpoint_path.exists():
             self.checkpoint_path.unlink()
 
-    def translate_chunk(self, text: str, prev_context: str = "", neural_fix: bool = False) -> str:
-        if not text.strip():
-            return text
-
-        # Extract code blocks — send only prose to the model
-        sanitized, code_blocks = _extract_code_blocks(text)
-
-        # Skip LLM entirely if there is no prose to translate
-        prose_only = _re.sub(r'«CODE_BLOCK_\d+»', '', sanitized).strip()
-        if not prose_only:
-            return text  # return original verbatim
-
-        prompt = _build_prompt(sanitized, prev_context)
-
-        for attempt in range(2):
-            if self.backend == "mlx":
-                result = _mlx_generate(prompt, self.model)
-            else:
-                result = _ollama_generate(prompt, self.model)
-
-            if not _is_hallucination(sanitized, result):
-                break
-            # Second attempt: stricter prompt, no context
-            prompt = _build_prompt(sanitized, "")
-
-        # Restore code blocks verbatim before any post-processing
-        result = _restore_code_blocks(result, code_blocks)
-        result = _fix_english_terms(result)
+    def _generate(self, prompt: str, source: str, final: bool = False) -> str:
+        if self.backend == "mlx":
+            return _mlx_generate(prompt, self.model, system=SYSTEM_PROMPT)
+        if final:
+            # Last attempt runs to completion: its text is kept whatever it looks like
+            return _ollama_generate(prompt, self.model)
+        # A runaway generation is cut off as soon as it is one — it is rejected and retried anyway
+        return _ollama_generate(prompt, self.model, abort_if=lambda partial: _is_runaway(source, partial))
 
-        if neural_fix:
-            result = _neural_fix_terms(text, result, self.backend, self.model)
-
-        return result
+    def translate_chunk(self, text: str, prev_context: str = "", neural_fix: bool = False) -> str:
+        return self.translate_batch([text], [prev_context], neural_fix=neural_fix)[0]
+
+    def translate_batch(
+        self, texts: list[str], prev_contexts: list[str], neural_fix: bool = False,
+    ) -> list[str]:
+        """Translate several chunks. With MLX the first attempt for all of them is one batched
+        generation; hallucination retries and the neural fix run per chunk."""
+        results = list(texts)
+        todo: list[tuple[int, str, list[str], Path | None]] = []  # (row, sanitized, code_blocks, cache_file)
+
+        for row, text in enumerate(texts):
+            if not text.strip():
+                continue
+
+            # Extract code blocks — send only prose to the model
+            sanitized, code_blocks = _extract_code_blocks(text)
+
+            # Skip LLM entirely if there is no prose to translate (code, URLs, numbers only)
+            if not _has_prose(sanitized):
+                self.verbatim_chunks += 1
+                continue  # return original verbatim
+
+            cache_file = None
+            if self.cache_dir is not None:
+                cache_file = _cache_file(self.cache_dir, self.backend, self.model, neural_fix, text)
+                if cache_file.exists():
+                    results[row] = cache_file.read_text(encoding="utf-8")
+                    continue
+
+            todo.append((row, sanitized, code_blocks, cache_file))
+
+        if not todo:
+            return results
+
+        prompts = [_build_prompt(sanitized, prev_contexts[row]) for row, sanitized, _, _ in todo]
+        if self.backend == "mlx" and len(prompts) > 1:
+            outputs = _mlx_generate_batch(prompts, self.model, system=SYSTEM_PROMPT)
+        else:
+            outputs = [self._generate(p, sanitized) for p, (_, sanitized, _, _) in zip(prompts, todo)]
+
+        for (row, sanitized, code_blocks, cache_file), result in zip(todo, outputs):
+            if _is_hallucination(sanitized, result):
+                # Second attempt: stricter prompt, no context
+                result = self._generate(_build_prompt(sanitized, ""), sanitized, final=True)
+                if _is_hallucination(sanitized, result):
+                    cache_file = None  # kept for this run, but never replayed from the cache
+
+            # Restore code blocks verbatim before any post-processing
+            result = _restore_code_blocks(result, code_blocks)
+            result = _fix_english_terms(result)
+
+            if neural_fix:
+                result = _neural_fix_terms(texts[row], result, self.backend, self.model)
+
+            if cache_file is not None and result.strip():
+                _cache_store(cache_file, result)
+            results[row] = result
+        return results
+
+    def fix_terms(self, source: str, translated: str) -> str:
+        """Neural term fix of an already translated chunk, cached like a --neural-fix translation."""
+        if translated == source:
+            return translated  # empty / code-only chunk came back verbatim — nothing to fix
+        cache_file = None
+        if self.cache_dir is not None:
+            cache_file = _cache_file(self.cache_dir, self.backend, self.model, True, source)
+            if cache_file.exists():
+                return cache_file.read_text(encoding="utf-8")
+            if not _cache_file(self.cache_dir, self.backend, self.model, False, source).exists():
+                cache_file = None  # translate_batch did not cache the translation — it failed the checks
+        fixed = _neural_fix_terms(source, translated, self.backend, self.model)
+        if cache_file is not None and fixed.strip():
+            _cache_store(cache_file, fixed)
+        return fixed
 
     def translate_chunks(
         self,
@@ -500,13 +888,18 @@ class Translator:
         resume: bool = True,
         chunks_imgs: list[list[tuple[float, str]]] | None = None,
         neural_fix: bool = False,
+        should_stop: Callable[[], bool] | None = None,
     ) -> str:
-        state = _load_checkpoint(self.checkpoint_path) if resume else {"chunks": {}, "last_chunk": -1}
         out = Path(output_path)
         out.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            state = _load_checkpoint(self.checkpoint_path)
+        else:
+            state = {"chunks": {}, "last_chunk": -1}
+            self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            self.checkpoint_path.write_text("", encoding="utf-8")  # truncate, don't unlink (Docker mount)
 
         results: list[str] = [""] * len(chunks_text)
-        prev_context = ""
 
         for idx_str, translated in state["chunks"].items():
             idx = int(idx_str)
@@ -515,36 +908,141 @@ class Translator:
 
         start_from = state["last_chunk"] + 1
         total = len(chunks_text)
-
-        from tqdm import tqdm
+        # With --parallel some chunks past last_chunk may already be done
+        pending = [i for i in range(start_from, total) if str(i) not in state["chunks"]]
 
         print(f"  Бекенд: {self.backend.upper()}")
         print(f"  Модель: {self.model}")
-        print(f"  Чанків: {total} (залишилось: {total - start_from})")
+        if self.parallel > 1:
+            label = "Батч MLX" if self.backend == "mlx" else "Паралельних запитів"
+            print(f"  {label}: {self.parallel}")
+        print(f"  Чанків: {total} (залишилось: {len(pending)})")
         print()
 
-        with tqdm(total=total, initial=start_from, unit="chunk", desc="Переклад") as pbar:
-            for i in range(start_from, total):
-                t0 = time.time()
-                translated = self.translate_chunk(chunks_text[i], prev_context, neural_fix=neural_fix)
-                elapsed = time.time() - t0
-
-                if chunks_imgs and i < len(chunks_imgs) and chunks_imgs[i]:
-                    translated = _interleave_images(translated, chunks_imgs[i])
-
-                results[i] = translated
-                prev_context = translated
-
-                state["chunks"][str(i)] = translated
-                state["last_chunk"] = i
-                _save_checkpoint(self.checkpoint_path, state, total=total)
-                _write_output(out, results, i)
-
-                remaining = total - i - 1
-                eta_min = int(remaining * elapsed / 60)
-                pbar.update(1)
-                pbar.set_postfix({"швидкість": f"{elapsed:.0f}с/чанк", "ETA": f"~{eta_min}хв"})
+        def with_images(i: int, translated: str) -> str:
+            if chunks_imgs and i < len(chunks_imgs) and chunks_imgs[i]:
+                return _interleave_images(translated, chunks_imgs[i])
+            return translated
 
-        full_text = "\n\n---\n\n".join(r for r in results if r)
-        out.write_text(full_text, encoding="utf-8")
-        return full_text
+        def translate(i: int, context: str) -> tuple[str, float]:
+            t0 = time.time()
+            translated = self.translate_chunk(chunks_text[i], context, neural_fix=neural_fix)
+            return with_images(i, translated), time.time() - t0
+
+        # The output .md is rewritten once with the resumed prefix, then only appended to
+        # as the contiguous prefix of finished chunks grows
+        _write_output(out, results, state["last_chunk"])
+        written = state["last_chunk"]
+        output_has_text = any(results[:written + 1])
+        # Disk writes run on one background thread (FIFO) while the model works on the next chunk
+        io_pool = ThreadPoolExecutor(max_workers=1)
+        io_jobs: deque = deque()
+
+        def persist(i: int, translated: str, done: int, new_texts: list[str], separate_first: bool) -> None:
+            _append_checkpoint(self.checkpoint_path, i, translated)
+            _save_progress(self.checkpoint_path, done, total)
+            if new_texts:
+                _append_output(out, new_texts, separate_first)
+
+        def record(i: int, translated: str, elapsed: float) -> None:
+            nonlocal written, output_has_text
+            while io_jobs and io_jobs[0].done():
+                io_jobs.popleft().result()  # surface a failed write
+            results[i] = translated
+            state["chunks"][str(i)] = translated
+            # last_chunk only advances over a contiguous prefix, so --resume stays correct
+            while str(state["last_chunk"] + 1) in state["chunks"]:
+                state["last_chunk"] += 1
+            new_texts = [r for r in results[written + 1:state["last_chunk"] + 1] if r]
+            separate_first = output_has_text
+            output_has_text = output_has_text or bool(new_texts)
+            written = state["last_chunk"]
+            io_jobs.append(io_pool.submit(
+                persist, i, translated, state["last_chunk"] + 1, new_texts, separate_first,
+            ))
+
+            remaining = total - pbar.n - 1
+            eta_min = int(remaining * elapsed / self.parallel / 60)
+            pbar.update(1)
+            pbar.set_postfix({"швидкість": f"{elapsed:.0f}с/чанк", "ETA": f"~{eta_min}хв"})
+
+        with io_pool, tqdm(total=total, initial=total - len(pending), unit="chunk", desc="Переклад") as pbar:
+            if self.parallel == 1 and neural_fix and self.backend == "ollama":
+                # Pipeline: the neural fix of chunk i (its own Ollama request) runs on a side thread
+                # while chunk i+1 is translated; chunk i is recorded once its fix is back
+                prev_context = ""
+                fixing: tuple[int, Future, float] | None = None  # (chunk, fix future, t0)
+                with ThreadPoolExecutor(max_workers=1) as fix_pool:
+                    try:
+                        for i in pending:
+                            if should_stop and should_stop():
+                                raise TranslationStopped(f"зупинено на чанку {i}")
+                            t0 = time.time()
+                            translated = self.translate_chunk(chunks_text[i], prev_context)
+                            prev_context = with_images(i, translated)
+                            if fixing:
+                                j, fut, started = fixing
+                                fixing = None
+                                record(j, with_images(j, fut.result()), time.time() - started)
+                            fixing = (i, fix_pool.submit(self.fix_terms, chunks_text[i], translated), t0)
+                    finally:
+                        if fixing:  # the last chunk, or the one in flight on stop
+                            j, fut, started = fixing
+                            record(j, with_images(j, fut.result()), time.time() - started)
+            elif self.parallel == 1:
+                prev_context = ""
+                for i in pending:
+                    if should_stop and should_stop():
+                        raise TranslationStopped(f"зупинено на чанку {i}")
+                    translated, elapsed = translate(i, prev_context)
+                    prev_context = translated
+                    record(i, translated, elapsed)
+            elif self.backend == "mlx":
+                # One batched generation per `parallel` chunks; like the Ollama path below,
+                # context is the previous *source* chunk since the batch is translated together.
+                # Within a window of a few batches chunks are sorted by length, so short prompts are
+                # not padded to (and stalled by) a long one; windows keep the output growing in order
+                window = self.parallel * MLX_SORT_WINDOW_BATCHES
+                order: list[int] = []
+                for w in range(0, len(pending), window):
+                    order += sorted(pending[w:w + window], key=lambda i: len(chunks_text[i]), reverse=True)
+                for start in range(0, len(order), self.parallel):
+                    if should_stop and should_stop():
+                        raise TranslationStopped(f"зупинено на чанку {state['last_chunk'] + 1}")
+                    batch = order[start:start + self.parallel]
+                    t0 = time.time()
+                    translated_batch = self.translate_batch(
+                        [chunks_text[i] for i in batch],
+                        [chunks_text[i - 1] if i > 0 else "" for i in batch],
+                        neural_fix=neural_fix,
+                    )
+                    elapsed = time.time() - t0
+                    for i, translated in zip(batch, translated_batch):
+                        record(i, with_images(i, translated), elapsed)
+            else:
+                # Requests are independent: context is the previous *source* chunk
+                # instead of the previous translation
+                with ThreadPoolExecutor(max_workers=self.parallel) as pool:
+                    futures = {
+                        pool.submit(translate, i, chunks_text[i - 1] if i > 0 else ""): i
+                        for i in pending
+                    }
+                    try:
+                        for fut in as_completed(futures):
+                            if should_stop and should_stop():
+                                raise TranslationStopped(f"зупинено на чанку {state['last_chunk'] + 1}")
+                            record(futures[fut], *fut.result())
+                    except BaseException:
+                        # Stop, a failed chunk or Ctrl-C: drop the queued chunks, only in-flight ones finish
+                        pool.shutdown(cancel_futures=True)
+                        raise
+        # io_pool has drained (also on stop/error), so the checkpoint is complete here
+        for job in io_jobs:
+            job.result()
+
+        if self.verbatim_chunks:
+            print(f"  Без моделі (лише код/URL/числа): {self.verbatim_chunks} чанків")
+
+        # The .md already holds every chunk (appended as the prefix completed) — no final rewrite;
+        # the joined text is only built for the caller's in-memory post-processing
+        return OUTPUT_SEPARATOR.join(r for r in results if r)
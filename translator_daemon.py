@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Long-lived translation worker used by api.py.
+
+Imports PyMuPDF / mlx once and keeps the MLX model resident, then runs
+translation jobs one at a time — a new book no longer pays interpreter start-up
+and model loading.
+
+Protocol — one JSON object per line:
+  stdin  → {"op": "run",  "job": "<book_id>", "args": [...`main.py translate` flags], "log": "<path>"}
+  stdin  → {"op": "stop", "job": "<book_id>"}
+  stdout ← {"job": "<book_id>", "status": "queued" | "running" | "done" | "stopped" | "failed"}
+
+A running job is stopped between chunks (checkpoint is already saved).
+When stdin closes (API went away) the current job is stopped and the daemon exits.
+"""
+
+import json
+import queue
+import sys
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+import extractor  # noqa: F401 — warm import (PyMuPDF)
+import main
+from translator import MLX_MODEL, TranslationStopped, _load_mlx_model
+
+# stdout belongs to the protocol; everything else printed outside a job goes to stderr
+_proto = sys.stdout
+sys.stdout = sys.stderr
+
+_emit_lock = threading.Lock()
+_state_lock = threading.Lock()   # guards _pending / _stopping / _current
+_queue: "queue.Queue[str | None]" = queue.Queue()
+_pending: dict[str, dict] = {}   # job → run message, until the worker picks it up
+_stopping: set[str] = set()
+_current: str | None = None
+
+
+def _emit(job: str, status: str) -> None:
+    with _emit_lock:
+        _proto.write(json.dumps({"job": job, "status": status}) + "\n")
+        _proto.flush()
+
+
+def _run(msg: dict) -> str:
+    job = msg["job"]
+    with open(msg["log"], "w", encoding="utf-8", buffering=1) as log, \
+            redirect_stdout(log), redirect_stderr(log):
+        try:
+            args = main.build_parser().parse_args(["translate", *msg["args"]])
+            main.cmd_translate(args, should_stop=lambda: job in _stopping)
+        except TranslationStopped as e:
+            print(f"\nПереклад зупинено ({e})")
+            return "stopped"
+        except (Exception, SystemExit):
+            traceback.print_exc()
+            return "failed"
+    return "done"
+
+
+def _worker() -> None:
+    global _current
+    while True:
+        job = _queue.get()
+        if job is None:
+            return
+        with _state_lock:
+            msg = _pending.pop(job, None)
+            if msg is None:
+                continue  # stopped while queued
+            _current = job
+        _emit(job, "running")
+        status = _run(msg)
+        with _state_lock:
+            _stopping.discard(job)
+            _current = None
+        _emit(job, status)
+
+
+def serve() -> None:
+    try:
+        _load_mlx_model(MLX_MODEL)
+    except ImportError:
+        pass  # no mlx-lm here — Ollama jobs still work
+
+    worker = threading.Thread(target=_worker, daemon=True)
+    worker.start()
+
+    for line in sys.stdin:
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            continue
+        job = msg.get("job")
+        if msg.get("op") == "run":
+            with _state_lock:
+                _pending[job] = msg
+            _emit(job, "queued")
+            _queue.put(job)
+        elif msg.get("op") == "stop":
+            with _state_lock:
+                if job == _current:
+                    _stopping.add(job)
+                    dropped = False
+                else:
+                    dropped = _pending.pop(job, None) is not None
+            if dropped:
+                _emit(job, "stopped")
+
+    with _state_lock:
+        if _current:
+            _stopping.add(_current)
+    _queue.put(None)
+    worker.join()
+
+
+if __name__ == "__main__":
+    serve()